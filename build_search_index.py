@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Provider Search Index Builder
+Builds an SQLite full-text search index from the merged master so provider
+search does not need LIKE '%q%' table scans.
+
+Tables written to the index database:
+- provider_search_docs: One row per provider (business name, city, state identity)
+- provider_search_fts: FTS5 word index (unicode61, diacritics removed)
+- provider_search_trigram: FTS5 trigram index for substring matches
+- provider_specialties: Normalized specialty -> provider lookup
+- provider_cities: Normalized (city, state) -> provider lookup
+- provider_search_partitions: Master partition versions already indexed
+
+Builds are incremental: only master partitions modified since the last build
+are read, and only rows whose content hash changed are re-indexed.
+
+Usage:
+    python build_search_index.py                  # Update data/search_index.db
+    python build_search_index.py --full           # Re-index every partition
+    python build_search_index.py --search "naturo" # Query the index
+"""
+
+import argparse
+import re
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from merge_providers import MASTER_DIR, PartitionedMaster, content_hash
+
+INDEX_DB = Path('data/search_index.db')
+
+# Trigram matching needs at least this many characters
+MIN_TRIGRAM_QUERY = 3
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS provider_search_docs (
+        rowid INTEGER PRIMARY KEY,
+        doc_key TEXT UNIQUE NOT NULL,
+        partition TEXT NOT NULL,
+        business_name TEXT NOT NULL,
+        city TEXT NOT NULL,
+        state TEXT NOT NULL,
+        status TEXT NOT NULL,
+        content_hash TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS provider_search_docs_partition_idx ON provider_search_docs(partition)",
+    "CREATE INDEX IF NOT EXISTS provider_search_docs_identity_idx ON provider_search_docs(business_name, city, state)",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS provider_search_fts USING fts5(
+        business_name, provider_name, description, specialties, city,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS provider_search_trigram USING fts5(
+        business_name, provider_name, description, specialties,
+        tokenize = 'trigram'
+    )""",
+    """CREATE TABLE IF NOT EXISTS provider_specialties (
+        specialty TEXT NOT NULL,
+        doc_rowid INTEGER NOT NULL,
+        PRIMARY KEY (specialty, doc_rowid)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS provider_cities (
+        city TEXT NOT NULL,
+        state TEXT NOT NULL,
+        doc_rowid INTEGER NOT NULL,
+        PRIMARY KEY (city, state, doc_rowid)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS provider_search_partitions (
+        partition TEXT PRIMARY KEY,
+        mtime INTEGER NOT NULL,
+        indexed_at TEXT NOT NULL
+    )""",
+]
+
+
+def document_key(row: Dict[str, str]) -> str:
+    """Identity used by /admin/import: business name + city + state."""
+    business = (row.get('businessName') or '').strip()
+    city = (row.get('city') or '').strip()
+    state = (row.get('state') or '').strip().upper()
+    return f"{business}|{city}|{state}"
+
+
+def normalize(value: str) -> str:
+    return re.sub(r'\s+', ' ', (value or '').strip().lower())
+
+
+def split_specialties(value: str) -> List[str]:
+    """Split specialties the same way the import route does (comma or semicolon)."""
+    return sorted({normalize(s) for s in re.split(r'[;,]', value or '') if s.strip()})
+
+
+def open_index(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode = WAL')
+    for statement in SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def delete_document(conn: sqlite3.Connection, rowid: int):
+    conn.execute('DELETE FROM provider_search_fts WHERE rowid = ?', (rowid,))
+    conn.execute('DELETE FROM provider_search_trigram WHERE rowid = ?', (rowid,))
+    conn.execute('DELETE FROM provider_specialties WHERE doc_rowid = ?', (rowid,))
+    conn.execute('DELETE FROM provider_cities WHERE doc_rowid = ?', (rowid,))
+    conn.execute('DELETE FROM provider_search_docs WHERE rowid = ?', (rowid,))
+
+
+def index_document(conn: sqlite3.Connection, partition: str, key: str, row: Dict[str, str], digest: str):
+    """Insert a provider into every index table."""
+    business = (row.get('businessName') or '').strip()
+    city = (row.get('city') or '').strip()
+    state = (row.get('state') or '').strip().upper()
+    provider_name = row.get('providerName') or ''
+    description = row.get('description') or ''
+    specialties = row.get('specialties') or ''
+
+    cursor = conn.execute(
+        'INSERT INTO provider_search_docs (doc_key, partition, business_name, city, state, status, content_hash) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        (key, partition, business, city, state, row.get('status') or 'PENDING', digest),
+    )
+    rowid = cursor.lastrowid
+
+    conn.execute(
+        'INSERT INTO provider_search_fts (rowid, business_name, provider_name, description, specialties, city) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        (rowid, business, provider_name, description, specialties, city),
+    )
+    conn.execute(
+        'INSERT INTO provider_search_trigram (rowid, business_name, provider_name, description, specialties) '
+        'VALUES (?, ?, ?, ?, ?)',
+        (rowid, business, provider_name, description, specialties),
+    )
+    conn.executemany(
+        'INSERT INTO provider_specialties (specialty, doc_rowid) VALUES (?, ?)',
+        [(specialty, rowid) for specialty in split_specialties(specialties)],
+    )
+    conn.execute(
+        'INSERT INTO provider_cities (city, state, doc_rowid) VALUES (?, ?, ?)',
+        (normalize(city), state, rowid),
+    )
+
+
+def index_partition(conn: sqlite3.Connection, master: PartitionedMaster, state: str) -> Tuple[int, int, int]:
+    """
+    Bring one partition's documents up to date.
+
+    Returns:
+        (added, updated, removed)
+    """
+    existing = {
+        r['doc_key']: (r['rowid'], r['content_hash'])
+        for r in conn.execute('SELECT rowid, doc_key, content_hash FROM provider_search_docs WHERE partition = ?', (state,))
+    }
+
+    # Later rows win, matching how /admin/import applies duplicates
+    current = {}
+    for row in master.rows(state):
+        if (row.get('businessName') or '').strip() and (row.get('city') or '').strip():
+            current[document_key(row)] = row
+
+    added = updated = removed = 0
+    for key, row in current.items():
+        digest = content_hash(row)
+        if key in existing:
+            rowid, old_digest = existing[key]
+            if old_digest == digest:
+                continue
+            delete_document(conn, rowid)
+            updated += 1
+        else:
+            added += 1
+        index_document(conn, state, key, row, digest)
+
+    for key in existing.keys() - current.keys():
+        delete_document(conn, existing[key][0])
+        removed += 1
+
+    return added, updated, removed
+
+
+def build_index(conn: sqlite3.Connection, master: PartitionedMaster, full: bool = False) -> Dict[str, int]:
+    """Re-index partitions modified since the last build; drop partitions no longer in the master."""
+    indexed = {r['partition']: r['mtime'] for r in conn.execute('SELECT partition, mtime FROM provider_search_partitions')}
+    totals = {'partitions': 0, 'added': 0, 'updated': 0, 'removed': 0}
+
+    for state in master.states():
+        path = master.partition_path(state)
+        if not path.exists():
+            continue
+        mtime = path.stat().st_mtime_ns
+        if not full and indexed.get(state) == mtime:
+            continue
+
+        with conn:
+            added, updated, removed = index_partition(conn, master, state)
+            conn.execute(
+                'INSERT OR REPLACE INTO provider_search_partitions (partition, mtime, indexed_at) VALUES (?, ?, ?)',
+                (state, mtime, datetime.now().isoformat(timespec='seconds')),
+            )
+        print(f"  {state}: {added} added, {updated} updated, {removed} removed")
+        totals['partitions'] += 1
+        totals['added'] += added
+        totals['updated'] += updated
+        totals['removed'] += removed
+
+    for state in indexed.keys() - set(master.states()):
+        with conn:
+            rowids = [r['rowid'] for r in conn.execute('SELECT rowid FROM provider_search_docs WHERE partition = ?', (state,))]
+            for rowid in rowids:
+                delete_document(conn, rowid)
+            conn.execute('DELETE FROM provider_search_partitions WHERE partition = ?', (state,))
+        print(f"  {state}: partition removed ({len(rowids)} documents)")
+        totals['removed'] += len(rowids)
+
+    return totals
+
+
+def search(conn: sqlite3.Connection, text: str, limit: int = 20) -> List[sqlite3.Row]:
+    """Find providers matching text, as a substring when long enough, otherwise by word prefix."""
+    phrase = '"' + text.strip().replace('"', '""') + '"'
+    if len(text.strip()) >= MIN_TRIGRAM_QUERY:
+        table, match = 'provider_search_trigram', phrase
+    else:
+        table, match = 'provider_search_fts', phrase + '*'
+
+    return conn.execute(
+        f'SELECT d.business_name, d.city, d.state, d.status FROM {table} f '
+        f'JOIN provider_search_docs d ON d.rowid = f.rowid '
+        f'WHERE {table} MATCH ? ORDER BY rank LIMIT ?',
+        (match, limit),
+    ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the provider search index from the master')
+    parser.add_argument('--db', default=str(INDEX_DB), help=f'Index database path (default: {INDEX_DB})')
+    parser.add_argument('--master-dir', default=str(MASTER_DIR), help='Directory holding the state-partitioned master')
+    parser.add_argument('--full', action='store_true', help='Re-index every partition')
+    parser.add_argument('--search', metavar='TEXT', help='Query the index instead of building it')
+    args = parser.parse_args()
+
+    conn = open_index(Path(args.db))
+
+    if args.search:
+        results = search(conn, args.search)
+        print(f"{len(results)} result(s) for '{args.search}':")
+        for r in results:
+            print(f"  {r['business_name']} - {r['city']}, {r['state']} [{r['status']}]")
+        return
+
+    print("=" * 60)
+    print("Provider Search Index Builder")
+    print("=" * 60)
+
+    master = PartitionedMaster.open(Path(args.master_dir))
+    if not master.states():
+        print("❌ No master partitions found. Run merge_providers.py first.")
+        sys.exit(1)
+
+    totals = build_index(conn, master, full=args.full)
+
+    if totals['partitions'] or totals['removed']:
+        with conn:
+            conn.execute("INSERT INTO provider_search_fts(provider_search_fts) VALUES ('optimize')")
+            conn.execute("INSERT INTO provider_search_trigram(provider_search_trigram) VALUES ('optimize')")
+        print(f"\n✅ Index updated: {args.db}")
+    else:
+        print(f"\n✅ Index already up to date: {args.db}")
+    print(f"   Partitions re-indexed: {totals['partitions']}")
+    print(f"   Added: {totals['added']}, updated: {totals['updated']}, removed: {totals['removed']}")
+    print("\n" + "=" * 60)
+
+
+if __name__ == '__main__':
+    main()
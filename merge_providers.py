@@ -1,24 +1,54 @@
 #!/usr/bin/env python3
 """
 Provider CSV Merge Script
-Merges all scraped provider CSVs into a master providers file.
+Merges all scraped provider CSVs into the state-partitioned master.
 
 Usage:
     python merge_providers.py                    # Merge all CSVs in data/scraped/
     python merge_providers.py --file data/scraped/providers_20260220_120000.csv  # Merge specific file
+    python merge_providers.py --delta            # Also export new/changed rows for /admin/import
+    python merge_providers.py --mark-synced      # Record the current master as already imported
+    python merge_providers.py --export data/providers_master_full.csv  # Single CSV for a full import
+
+Storage:
+    The master lives in data/master/ as one providers_<STATE>.csv per state
+    plus catalog.json (row counts and sync state per partition) and
+    places.db (place_id -> partition lookup). Only the partitions touched
+    by a merge are read and rewritten. An existing data/providers_master.csv is split into
+    partitions on first run (other tools only warn about it).
+
+Identity:
+    Rows are keyed by Google's place_id (placeId column) when known, in any
+    partition, falling back to business name + address/city + state. A scraped
+    row matching an existing row by name backfills that row's placeId.
+
+Delta export:
+    Each master row stores a contentHash of its import fields as of the last
+    delta export. Rows whose current hash differs (new rows, or rows edited
+    since) are written to data/deltas/providers_delta_YYYYMMDD_HHMMSS.csv.
 """
 
 import csv
+import hashlib
+import json
 import os
+import sqlite3
 import sys
 import argparse
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Set
+from typing import Dict, List, Optional, Set
 
 # Configure paths
 SCRAPED_DIR = Path('data/scraped')
-MASTER_CSV = Path('data/providers_master.csv')
+MASTER_DIR = Path('data/master')
+MASTER_CSV = Path('data/providers_master.csv')  # Legacy single-file master, split on first run
+DELTA_DIR = Path('data/deltas')
+CATALOG_NAME = 'catalog.json'
+PLACES_DB_NAME = 'places.db'
+
+# Partition for rows without a state
+UNKNOWN_PARTITION = 'UNKNOWN'
 
 # CSV Headers
 HEADERS = [
@@ -27,9 +57,24 @@ HEADERS = [
     'latitude', 'longitude', 'status'
 ]
 
+# Identity and freshness columns (kept in master, not needed by /admin/import)
+TRACKING_HEADERS = ['placeId', 'lastVerified', 'verifyFailures']
+
+# Master-only column: hash of the row as of its last delta export
+HASH_FIELD = 'contentHash'
+MASTER_HEADERS = HEADERS + TRACKING_HEADERS + [HASH_FIELD]
+
 
 def generate_provider_key(row: Dict[str, str]) -> str:
-    """Generate unique key for deduplication based on business name and location."""
+    """Generate unique key for deduplication - place_id when known, otherwise name and location."""
+    place_id = (row.get('placeId') or '').strip()
+    if place_id:
+        return f"place:{place_id}"
+    return generate_name_key(row)
+
+
+def generate_name_key(row: Dict[str, str]) -> str:
+    """Generate fallback key based on business name and location."""
     business = row.get('businessName', '').lower().strip()
     city = row.get('city', '').lower().strip()
     state = row.get('state', '').upper().strip()
@@ -41,99 +86,371 @@ def generate_provider_key(row: Dict[str, str]) -> str:
     return f"{business}_{city}_{state}"
 
 
-def load_existing_providers(master_path: Path) -> tuple[Dict[str, Dict], Set[str]]:
-    """Load existing providers from master CSV."""
-    providers = {}
-    keys = set()
+def provider_keys(row: Dict[str, str]) -> List[str]:
+    """All keys a row can be matched by, primary key first."""
+    keys = [generate_provider_key(row)]
+    name_key = generate_name_key(row)
+    if name_key not in keys:
+        keys.append(name_key)
+    return keys
+
+
+def content_hash(row: Dict[str, str]) -> str:
+    """Hash the import fields of a row to detect changes between delta exports."""
+    payload = '\x1f'.join((row.get(header) or '').strip() for header in HEADERS)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def find_changed_rows(all_providers: list) -> list:
+    """
+    Find rows that are new or changed since the last delta export.
+    
+    Returns:
+        List of (row, new_hash) pairs
+    """
+    changed = []
+    for row in all_providers:
+        digest = content_hash(row)
+        if row.get(HASH_FIELD) != digest:
+            changed.append((row, digest))
+    return changed
+
+
+def partition_key(row: Dict[str, str]) -> str:
+    """Partition (state code) a row belongs to."""
+    return (row.get('state') or '').upper().strip() or UNKNOWN_PARTITION
+
+
+class PartitionedMaster:
+    """
+    Master provider list stored as one CSV per state plus a small catalog.
+    
+    Partitions are loaded on first access, so callers only pay for the
+    states they touch. save() rewrites only partitions marked dirty.
+    A place_id -> partition lookup is kept in a separate SQLite file and
+    queried one place_id at a time, so a place already stored under another
+    state is found without loading every partition or the whole map.
+    """
+    
+    def __init__(self, master_dir: Path = MASTER_DIR):
+        self.master_dir = Path(master_dir)
+        self.catalog_path = self.master_dir / CATALOG_NAME
+        self.places_path = self.master_dir / PLACES_DB_NAME
+        self.catalog: Dict[str, Dict] = self._load_catalog()
+        self._places_conn: Optional[sqlite3.Connection] = None
+        self._new_places: Dict[str, str] = {}  # place_id -> partition, not yet saved
+        self._rows: Dict[str, List[Dict]] = {}
+        self._index: Dict[str, Dict[str, Dict]] = {}
+        self.dirty: Set[str] = set()
+    
+    @classmethod
+    def open(cls, master_dir: Path = MASTER_DIR, legacy_csv: Path = MASTER_CSV,
+             migrate: bool = False) -> 'PartitionedMaster':
+        """
+        Open the partitioned master.
+        
+        A legacy single-file master is split into partitions only when
+        migrate is set (merge_providers.py); other callers just get a warning.
+        """
+        master = cls(master_dir)
+        if not master.catalog and Path(legacy_csv).exists():
+            if migrate:
+                master.import_legacy(Path(legacy_csv))
+            else:
+                print(f"⚠️  {legacy_csv} has not been split into {master.master_dir} yet - "
+                      f"run merge_providers.py to migrate it")
+        return master
+    
+    def _load_catalog(self) -> Dict[str, Dict]:
+        if not self.catalog_path.exists():
+            return {}
+        with open(self.catalog_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('partitions', {})
+    
+    def _places_db(self, create: bool = False) -> Optional[sqlite3.Connection]:
+        """Connection to the place_id lookup (None if it doesn't exist and create is False)."""
+        if self._places_conn is None and (create or self.places_path.exists()):
+            self.master_dir.mkdir(parents=True, exist_ok=True)
+            # Callers serialize access to the master; the scraper uses it from search threads
+            self._places_conn = sqlite3.connect(self.places_path, check_same_thread=False)
+            self._places_conn.execute(
+                'CREATE TABLE IF NOT EXISTS places (place_id TEXT PRIMARY KEY, partition TEXT NOT NULL) WITHOUT ROWID'
+            )
+            self._places_conn.execute('CREATE INDEX IF NOT EXISTS places_partition_idx ON places(partition)')
+        return self._places_conn
+    
+    def partition_of(self, place_id: str) -> Optional[str]:
+        """Partition holding place_id, if it is in the master."""
+        place_id = (place_id or '').strip()
+        if not place_id:
+            return None
+        if place_id in self._new_places:
+            return self._new_places[place_id]
+        conn = self._places_db()
+        if conn is None:
+            return None
+        found = conn.execute('SELECT partition FROM places WHERE place_id = ?', (place_id,)).fetchone()
+        return found[0] if found else None
+    
+    def states(self) -> List[str]:
+        """All partitions listed in the catalog."""
+        return sorted(self.catalog)
+    
+    def partition_path(self, state: str) -> Path:
+        return self.master_dir / f"providers_{state}.csv"
+    
+    def rows(self, state: str) -> List[Dict]:
+        """Rows for one state, loading the partition on first access."""
+        state = state.upper().strip() or UNKNOWN_PARTITION
+        if state not in self._rows:
+            rows = []
+            path = self.partition_path(state)
+            if state in self.catalog and path.exists():
+                with open(path, 'r', encoding='utf-8', newline='') as f:
+                    rows = list(csv.DictReader(f))
+            
+            index = {}
+            for row in rows:
+                for key in provider_keys(row):
+                    index.setdefault(key, row)
+            self._rows[state] = rows
+            self._index[state] = index
+        return self._rows[state]
+    
+    def index(self, state: str) -> Dict[str, Dict]:
+        """Key -> row index for one state (place_id and name keys)."""
+        state = state.upper().strip() or UNKNOWN_PARTITION
+        self.rows(state)
+        return self._index[state]
+    
+    def find(self, row: Dict[str, str]) -> Optional[Dict]:
+        """Find the existing row matching row by place_id (any partition), then by name."""
+        place_id = (row.get('placeId') or '').strip()
+        state = self.partition_of(place_id)
+        if state is not None:
+            existing = self.index(state).get(f"place:{place_id}")
+            if existing is not None:
+                return existing
+        
+        index = self.index(partition_key(row))
+        return next((index[k] for k in provider_keys(row) if k in index), None)
+    
+    def all_rows(self, states: Optional[List[str]] = None) -> List[Dict]:
+        """Rows for the given states (default: every partition)."""
+        rows = []
+        for state in states if states is not None else self.states():
+            rows.extend(self.rows(state))
+        return rows
+    
+    def add(self, row: Dict[str, str]):
+        """Add a new row to its state partition."""
+        state = partition_key(row)
+        self.rows(state).append(row)
+        for key in provider_keys(row):
+            self._index[state].setdefault(key, row)
+        place_id = (row.get('placeId') or '').strip()
+        if place_id:
+            self._new_places.setdefault(place_id, state)
+        self.dirty.add(state)
+    
+    def register_key(self, row: Dict[str, str], key: str):
+        """Index an existing row under an extra key and mark its partition dirty."""
+        state = partition_key(row)
+        self.index(state).setdefault(key, row)
+        if key.startswith('place:'):
+            self._new_places.setdefault(key[len('place:'):], state)
+        self.dirty.add(state)
     
-    if not master_path.exists():
-        print(f"No existing master CSV found at {master_path}")
-        return providers, keys
+    def mark_dirty(self, row: Dict[str, str]):
+        self.dirty.add(partition_key(row))
     
+    def needs_delta_check(self, state: str) -> bool:
+        """Whether a partition may hold rows not yet exported in a delta."""
+        entry = self.catalog.get(state, {})
+        path = self.partition_path(state)
+        if entry.get('unsynced', 1) or not path.exists():
+            return True
+        # Edited outside the merge tool (e.g. status changes in Excel)
+        return path.stat().st_mtime_ns != entry.get('mtime')
+    
+    def _rebalance(self):
+        """Move rows whose state changed (e.g. a relocated business) to the right partition."""
+        for state in list(self._rows):
+            moved = [row for row in self._rows[state] if partition_key(row) != state]
+            if not moved:
+                continue
+            self._rows[state] = [row for row in self._rows[state] if partition_key(row) == state]
+            self.dirty.add(state)
+            for row in moved:
+                self.add(row)
+    
+    def save(self) -> List[str]:
+        """
+        Write dirty partitions and the catalog.
+        
+        Returns:
+            States whose partitions were rewritten
+        """
+        self._rebalance()
+        self.master_dir.mkdir(parents=True, exist_ok=True)
+        written = sorted(self.dirty)
+        
+        for state in written:
+            rows = self._rows.get(state, [])
+            path = self.partition_path(state)
+            if not rows:
+                if path.exists():
+                    path.unlink()
+                self.catalog.pop(state, None)
+                continue
+            
+            tmp_path = path.with_suffix('.csv.tmp')
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=MASTER_HEADERS, restval='', extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(rows)
+            os.replace(tmp_path, path)
+            
+            self.catalog[state] = {
+                'file': path.name,
+                'rows': len(rows),
+                'unsynced': sum(1 for row in rows if row.get(HASH_FIELD) != content_hash(row)),
+                'mtime': path.stat().st_mtime_ns,
+                'updated': datetime.now().isoformat(timespec='seconds'),
+            }
+        
+        tmp_path = self.catalog_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'partitions': dict(sorted(self.catalog.items()))}, f, indent=2)
+        os.replace(tmp_path, self.catalog_path)
+        
+        # Replace the place_id lookup entries of every rewritten partition
+        conn = self._places_db(create=True)
+        with conn:
+            for state in written:
+                conn.execute('DELETE FROM places WHERE partition = ?', (state,))
+                conn.executemany(
+                    'INSERT OR IGNORE INTO places (place_id, partition) VALUES (?, ?)',
+                    [(place_id, state) for place_id in
+                     {(row.get('placeId') or '').strip() for row in self._rows.get(state, [])} if place_id],
+                )
+        self._new_places.clear()
+        
+        self.dirty.clear()
+        return written
+    
+    def import_legacy(self, csv_path: Path):
+        """Split a single-file master CSV into state partitions."""
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        
+        for row in rows:
+            self.add(row)
+        written = self.save()
+        print(f"Split {len(rows)} providers from {csv_path} into {len(written)} state partitions in {self.master_dir}")
+        print(f"   {csv_path} is no longer read and can be archived")
+
+
+def write_master_csv(master_path: Path, all_providers: list):
+    """Write providers to a single CSV (full export for /admin/import)."""
     try:
-        with open(master_path, 'r', encoding='utf-8', newline='') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                key = generate_provider_key(row)
-                keys.add(key)
-                providers[key] = row
+        # Create directory if needed
+        master_path.parent.mkdir(parents=True, exist_ok=True)
         
-        print(f"Loaded {len(providers)} existing providers from master CSV")
-        return providers, keys
+        with open(master_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=HEADERS, restval='', extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(all_providers)
+        
+        print(f"\n✅ Full CSV exported: {master_path}")
+        print(f"   Total providers: {len(all_providers)}")
         
     except Exception as e:
-        print(f"Error loading master CSV: {e}")
-        return providers, keys
+        print(f"Error writing master CSV: {e}")
+        sys.exit(1)
 
 
-def merge_csv_file(csv_path: Path, existing_keys: Set[str]) -> tuple[list, int, int]:
+def merge_csv_file(csv_path: Path, master: PartitionedMaster) -> tuple[int, int, int]:
     """
     Merge a single CSV file.
     
+    Rows are matched against existing providers by place_id first (in any
+    state partition), then by name within the row's state partition. Name
+    matches backfill a missing placeId on the existing row.
+    
     Returns:
-        (new_providers, added_count, skipped_count)
+        (added_count, skipped_count, backfilled_count)
     """
-    new_providers = []
     added = 0
     skipped = 0
+    backfilled = 0
     
     try:
         with open(csv_path, 'r', encoding='utf-8', newline='') as f:
             reader = csv.DictReader(f)
             
             for row in reader:
-                key = generate_provider_key(row)
+                existing = master.find(row)
                 
-                if key in existing_keys:
+                if existing is not None:
                     skipped += 1
+                    place_id = (row.get('placeId') or '').strip()
+                    if place_id and not (existing.get('placeId') or '').strip():
+                        existing['placeId'] = place_id
+                        master.register_key(existing, f"place:{place_id}")
+                        backfilled += 1
                 else:
                     # Ensure all required fields exist
-                    complete_row = {header: row.get(header, '') for header in HEADERS}
-                    new_providers.append(complete_row)
-                    existing_keys.add(key)
+                    complete_row = {header: row.get(header, '') for header in HEADERS + TRACKING_HEADERS}
+                    master.add(complete_row)
                     added += 1
         
-        print(f"  Processed {csv_path.name}: {added} new, {skipped} duplicates")
-        return new_providers, added, skipped
+        print(f"  Processed {csv_path.name}: {added} new, {skipped} duplicates, {backfilled} place IDs backfilled")
+        return added, skipped, backfilled
         
     except Exception as e:
         print(f"  Error processing {csv_path.name}: {e}")
-        return [], 0, 0
+        return 0, 0, 0
 
 
-def write_master_csv(master_path: Path, all_providers: list):
-    """Write all providers to master CSV."""
+def write_delta_csv(delta_path: Path, rows: list):
+    """Write new/changed providers to a delta CSV for /admin/import."""
     try:
-        # Create directory if needed
-        master_path.parent.mkdir(parents=True, exist_ok=True)
+        delta_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(master_path, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=HEADERS)
+        with open(delta_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=HEADERS, restval='', extrasaction='ignore')
             writer.writeheader()
-            writer.writerows(all_providers)
+            writer.writerows(rows)
         
-        print(f"\n✅ Master CSV updated: {master_path}")
-        print(f"   Total providers: {len(all_providers)}")
+        print(f"\n✅ Delta CSV written: {delta_path}")
+        print(f"   New or changed providers: {len(rows)}")
         
     except Exception as e:
-        print(f"Error writing master CSV: {e}")
+        print(f"Error writing delta CSV: {e}")
         sys.exit(1)
 
 
 def main():
     parser = argparse.ArgumentParser(description='Merge provider CSVs into master file')
     parser.add_argument('--file', help='Specific CSV file to merge (otherwise merges all in data/scraped/)')
-    parser.add_argument('--master', default=str(MASTER_CSV), help='Path to master CSV file')
+    parser.add_argument('--master-dir', default=str(MASTER_DIR), help='Directory holding the state-partitioned master')
+    parser.add_argument('--delta', nargs='?', const='', default=None, metavar='PATH',
+                        help=f'Export new/changed rows to PATH (default: {DELTA_DIR}/providers_delta_<timestamp>.csv)')
+    parser.add_argument('--mark-synced', action='store_true',
+                        help='Record every master row as imported without exporting a delta')
+    parser.add_argument('--export', metavar='PATH',
+                        help='Also write every partition to a single CSV for a full /admin/import')
     args = parser.parse_args()
     
-    master_path = Path(args.master)
-    
     print("=" * 60)
     print("Provider CSV Merge Tool")
     print("=" * 60)
     
-    # Load existing providers
-    existing_providers, existing_keys = load_existing_providers(master_path)
+    # Open partitioned master (partitions load on demand)
+    master = PartitionedMaster.open(Path(args.master_dir), migrate=True)
+    print(f"Master catalog: {len(master.states())} state partitions, "
+          f"{sum(entry.get('rows', 0) for entry in master.catalog.values())} providers")
     
     # Determine which files to merge
     if args.file:
@@ -148,34 +465,58 @@ def main():
         csv_files = sorted(SCRAPED_DIR.glob('providers_*.csv'))
         print(f"\nFound {len(csv_files)} CSV files in {SCRAPED_DIR}")
     
-    if not csv_files:
+    if not csv_files and args.delta is None and not args.mark_synced and not args.export:
         print("No CSV files to merge")
         sys.exit(0)
     
     # Merge all files
     total_added = 0
     total_skipped = 0
-    all_new_providers = []
+    total_backfilled = 0
     
     print("\nMerging files:")
     for csv_file in csv_files:
-        new_providers, added, skipped = merge_csv_file(csv_file, existing_keys)
-        all_new_providers.extend(new_providers)
+        added, skipped, backfilled = merge_csv_file(csv_file, master)
         total_added += added
         total_skipped += skipped
+        total_backfilled += backfilled
+    
+    # Stamp hashes for rows exported in the delta (or all rows when marking synced).
+    # Partitions with nothing unsynced and no outside edits are skipped.
+    changed = []
+    if args.delta is not None or args.mark_synced:
+        states = sorted(set(master.states()) | master.dirty)
+        changed = find_changed_rows(master.all_rows([s for s in states if s in master.dirty or master.needs_delta_check(s)]))
     
-    # Combine existing + new providers
-    all_providers = list(existing_providers.values()) + all_new_providers
+    if args.delta is not None:
+        if changed:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            delta_path = Path(args.delta) if args.delta else DELTA_DIR / f"providers_delta_{timestamp}.csv"
+            write_delta_csv(delta_path, [row for row, _ in changed])
+        else:
+            print("\n✅ No new or changed providers since the last delta export")
     
-    # Write master CSV
-    if all_new_providers:
-        write_master_csv(master_path, all_providers)
+    for row, digest in changed:
+        row[HASH_FIELD] = digest
+        master.mark_dirty(row)
+    
+    # Write only the partitions that changed
+    if master.dirty:
+        written = master.save()
+        print(f"\n✅ Master updated: {master.master_dir}")
+        print(f"   Partitions rewritten: {', '.join(written)}")
         print(f"\nSummary:")
         print(f"  New providers added: {total_added}")
         print(f"  Duplicates skipped: {total_skipped}")
+        print(f"  Place IDs backfilled: {total_backfilled}")
+        if args.mark_synced:
+            print(f"  Rows marked as synced: {len(changed)}")
     else:
         print(f"\n✅ No new providers to add (all {total_skipped} were duplicates)")
     
+    if args.export:
+        write_master_csv(Path(args.export), master.all_rows())
+    
     print("\n" + "=" * 60)
 
 
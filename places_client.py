@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Google Places API Client
+Credential pool and pooled HTTP session shared by the scraper and tools.
+
+Keys are read from the environment (set in .env file):
+- GOOGLE_MAPS_API_KEYS: Comma-separated list of keys (preferred)
+- GOOGLE_MAPS_API_KEY: Single key (still supported, merged into the pool)
+
+Each key has its own token bucket, usage counter and cool-down window.
+Requests go to the healthy key with the most tokens available, so the
+aggregate request rate grows with the number of keys provisioned.
+
+Optional tuning:
+- GOOGLE_MAPS_KEY_QPS: Sustained requests per second per key (default 0.66)
+- GOOGLE_MAPS_KEY_BURST: Token bucket size per key (default 2)
+- GOOGLE_MAPS_DAILY_QUOTA: Requests per key per calendar day, 0 = unlimited (default 0)
+- GOOGLE_MAPS_USAGE_DB: Where daily counts are kept when a quota is set
+  (default data/api_usage.db), so the limit holds across separate runs
+"""
+
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+PLACES_TEXTSEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+PLACES_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+PLACES_FINDPLACE_URL = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
+
+# Defaults match the old fixed 1.5 second delay between searches
+DEFAULT_KEY_QPS = 0.66
+DEFAULT_KEY_BURST = 2
+
+# Base cool-down per key-level error status; doubles on consecutive errors
+COOLDOWN_SECONDS = {
+    'OVER_QUERY_LIMIT': 60,
+    'REQUEST_DENIED': 15 * 60,
+}
+MAX_COOLDOWN_SECONDS = 24 * 60 * 60
+
+# Give up instead of sleeping longer than this waiting for a key
+MAX_ACQUIRE_WAIT = 5 * 60
+
+# Per-key daily request counts shared by every scraper/refresh process
+USAGE_DB = Path('data/api_usage.db')
+
+
+class CredentialsExhausted(Exception):
+    """Raised when no API key can serve a request in a reasonable time."""
+
+
+class PlacesApiError(Exception):
+    """Raised for a Places API status that says nothing about the place itself."""
+
+    def __init__(self, status: str):
+        super().__init__(f"Google Places API error: {status or 'Unknown'}")
+        self.status = status
+
+
+@dataclass
+class ApiKey:
+    """State for a single API key in the pool."""
+    key: str
+    rate: float
+    capacity: float
+    daily_quota: int = 0
+    tokens: float = 0.0
+    updated_at: float = field(default_factory=time.monotonic)
+    requests_made: int = 0
+    requests_today: int = 0
+    quota_day: str = ''  # Calendar day requests_today counts against
+    errors: int = 0
+    strikes: int = 0
+    cooldown_until: float = 0.0
+    last_status: str = ''
+
+    @property
+    def label(self) -> str:
+        """Short identifier that is safe to log."""
+        return f"...{self.key[-6:]}"
+
+    @property
+    def key_id(self) -> str:
+        """Identifier that is safe to store (the key itself never is)."""
+        return hashlib.sha1(self.key.encode('utf-8')).hexdigest()[:12]
+
+    def refill(self, now: float):
+        """Add tokens earned since the last refill."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def roll_day(self, today: str):
+        """Reset the daily counter when the calendar day changes."""
+        if self.quota_day != today:
+            self.quota_day = today
+            self.requests_today = 0
+
+    def quota_left(self) -> bool:
+        return not self.daily_quota or self.requests_today < self.daily_quota
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until this key can serve a request (inf if out of quota)."""
+        if not self.quota_left():
+            return math.inf
+        wait = max(0.0, self.cooldown_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+
+class UsageStore:
+    """Per-key daily request counts in SQLite, shared by every process using the keys."""
+
+    def __init__(self, db_path: Path = USAGE_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS key_usage (
+                key_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (key_id, day)
+            )""")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def counts(self, day: str) -> Dict[str, int]:
+        with self._connect() as conn:
+            return dict(conn.execute('SELECT key_id, requests FROM key_usage WHERE day = ?', (day,)))
+
+    def increment(self, key_id: str, day: str):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO key_usage (key_id, day, requests) VALUES (?, ?, 1) '
+                'ON CONFLICT (key_id, day) DO UPDATE SET requests = requests + 1',
+                (key_id, day),
+            )
+
+
+class CredentialPool:
+    """Schedule requests across multiple Google API keys."""
+
+    def __init__(self, keys: List[str], rate: float = DEFAULT_KEY_QPS,
+                 burst: float = DEFAULT_KEY_BURST, daily_quota: int = 0,
+                 usage: Optional[UsageStore] = None):
+        unique_keys = list(dict.fromkeys(k.strip() for k in keys if k and k.strip()))
+        self.keys = [
+            ApiKey(key=k, rate=rate, capacity=burst, daily_quota=daily_quota, tokens=burst)
+            for k in unique_keys
+        ]
+        self.usage = usage
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'CredentialPool':
+        """Build a pool from GOOGLE_MAPS_API_KEYS / GOOGLE_MAPS_API_KEY."""
+        keys = os.getenv('GOOGLE_MAPS_API_KEYS', '').split(',')
+        keys.append(os.getenv('GOOGLE_MAPS_API_KEY', ''))
+        daily_quota = int(os.getenv('GOOGLE_MAPS_DAILY_QUOTA', 0))
+        usage = UsageStore(Path(os.getenv('GOOGLE_MAPS_USAGE_DB', USAGE_DB))) if daily_quota else None
+        return cls(
+            keys,
+            rate=float(os.getenv('GOOGLE_MAPS_KEY_QPS', DEFAULT_KEY_QPS)),
+            burst=float(os.getenv('GOOGLE_MAPS_KEY_BURST', DEFAULT_KEY_BURST)),
+            daily_quota=daily_quota,
+            usage=usage,
+        )
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self, max_wait: float = MAX_ACQUIRE_WAIT) -> ApiKey:
+        """
+        Take a token from the healthiest key, sleeping until one is available.
+
+        Raises:
+            CredentialsExhausted: If no key can serve a request within max_wait
+        """
+        if not self.keys:
+            raise CredentialsExhausted("No Google Maps API keys configured")
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                today = date.today().isoformat()
+                # Counts from other processes using the same keys today
+                shared = self.usage.counts(today) if self.usage else None
+                for api_key in self.keys:
+                    api_key.refill(now)
+                    api_key.roll_day(today)
+                    if shared is not None:
+                        api_key.requests_today = shared.get(api_key.key_id, 0)
+
+                ready = [k for k in self.keys if k.wait_time(now) == 0]
+                if ready:
+                    # Most tokens first, then least used to spread quota evenly
+                    api_key = max(ready, key=lambda k: (k.tokens, -k.requests_made))
+                    api_key.tokens -= 1
+                    api_key.requests_made += 1
+                    api_key.requests_today += 1
+                    if self.usage:
+                        self.usage.increment(api_key.key_id, today)
+                    return api_key
+
+                wait = min(k.wait_time(now) for k in self.keys)
+
+            if wait > max_wait:
+                raise CredentialsExhausted(
+                    f"All {len(self.keys)} API keys are cooling down or out of quota"
+                )
+            time.sleep(wait)
+
+    def release(self, api_key: ApiKey, status: str):
+        """Record the API status returned for a request made with api_key."""
+        with self._lock:
+            api_key.last_status = status
+            base = COOLDOWN_SECONDS.get(status)
+            if base is None:
+                api_key.strikes = 0
+                return
+
+            api_key.errors += 1
+            api_key.strikes += 1
+            cooldown = min(base * 2 ** (api_key.strikes - 1), MAX_COOLDOWN_SECONDS)
+            api_key.cooldown_until = time.monotonic() + cooldown
+            api_key.tokens = 0
+
+        logger.warning(f"API key {api_key.label} returned {status} - cooling down for {cooldown}s")
+
+    def stats(self) -> List[Dict]:
+        """Per-key usage summary."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    'key': k.label,
+                    'requests': k.requests_made,
+                    'today': k.requests_today,
+                    'errors': k.errors,
+                    'last_status': k.last_status,
+                    'cooldown': max(0, round(k.cooldown_until - now)),
+                }
+                for k in self.keys
+            ]
+
+
+def build_session(pool_size: int = 10) -> requests.Session:
+    """Create a session with a keep-alive connection pool sized for pool_size workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    })
+    return session
+
+
+def places_get(session: requests.Session, pool: CredentialPool, url: str,
+               params: Dict, timeout: float = 10) -> Dict:
+    """
+    Call a Places API endpoint, picking a key from the pool.
+
+    Requests rejected with a key-level error (OVER_QUERY_LIMIT, REQUEST_DENIED)
+    are retried once on each other key before the response is returned.
+
+    Raises:
+        CredentialsExhausted: If no key is available
+        requests.RequestException: On HTTP or network errors
+    """
+    data: Dict = {}
+    for _ in range(max(1, len(pool))):
+        api_key = pool.acquire()
+        try:
+            response = session.get(url, params={**params, 'key': api_key.key}, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError):
+            pool.release(api_key, 'HTTP_ERROR')
+            raise
+
+        status = data.get('status', '')
+        pool.release(api_key, status)
+        if status not in COOLDOWN_SECONDS:
+            break
+
+    return data
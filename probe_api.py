@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Google Places API Probe
+Measures latency and sustainable request rate against the Places endpoint
+(or a local stand-in) to size scraper concurrency and rate-limit settings.
+
+Usage:
+    python probe_api.py                                   # 50 requests, 4 workers, unthrottled
+    python probe_api.py --requests 200 --concurrency 8 --rate 5
+    python probe_api.py --ramp 1 2 4 8 16                 # Find max QPS before OVER_QUERY_LIMIT
+    python probe_api.py --url http://localhost:8080/textsearch/json --queries-file queries.txt
+
+Keys are read the same way as the scraper (GOOGLE_MAPS_API_KEYS / GOOGLE_MAPS_API_KEY)
+and used round-robin without the scraper's per-key throttling. They are only sent
+to the Google endpoint; pass --send-keys to send them to a custom --url as well.
+"""
+
+import argparse
+import itertools
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+from places_client import PLACES_TEXTSEARCH_URL, CredentialPool, build_session
+
+DEFAULT_QUERIES = [
+    "Functional Medicine Los Angeles CA",
+    "Functional Medicine doctor Los Angeles CA",
+    "Naturopathic doctor Los Angeles CA",
+    "Chiropractor Los Angeles CA",
+    "Acupuncture Los Angeles CA",
+]
+
+# API statuses that count as a successful request
+OK_STATUSES = {'OK', 'ZERO_RESULTS'}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def send_request(session: requests.Session, url: str, query: str,
+                 key: Optional[str], timeout: float) -> Tuple[float, str]:
+    """Send one search and return (latency_seconds, status)."""
+    params = {'query': query}
+    if key:
+        params['key'] = key
+
+    start = time.perf_counter()
+    try:
+        response = session.get(url, params=params, timeout=timeout)
+        latency = time.perf_counter() - start
+        if response.status_code != 200:
+            return latency, f"HTTP_{response.status_code}"
+        return latency, response.json().get('status', 'UNKNOWN')
+    except ValueError:
+        return time.perf_counter() - start, 'INVALID_JSON'
+    except requests.RequestException as e:
+        return time.perf_counter() - start, type(e).__name__
+
+
+def run_stage(url: str, queries: List[str], keys: List[str], total: int,
+              concurrency: int, rate: float, timeout: float) -> Dict:
+    """
+    Run one load stage.
+
+    Requests are dispatched on a fixed schedule when rate > 0 (open loop),
+    otherwise as fast as the workers can send them.
+
+    Returns:
+        Dict with latencies, status counts, elapsed time and achieved QPS
+    """
+    session = build_session(pool_size=concurrency)
+    query_cycle = itertools.cycle(queries)
+    key_cycle = itertools.cycle(keys or [None])
+    lock = threading.Lock()
+    counter = itertools.count()
+    results: List[Tuple[float, str]] = []
+    start = time.perf_counter()
+
+    def worker():
+        while True:
+            with lock:
+                index = next(counter)
+                if index >= total:
+                    return
+                query = next(query_cycle)
+                key = next(key_cycle)
+
+            if rate > 0:
+                delay = start + index / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            result = send_request(session, url, query, key, timeout)
+            with lock:
+                results.append(result)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+
+    elapsed = time.perf_counter() - start
+    session.close()
+
+    return {
+        'latencies': sorted(latency for latency, _ in results),
+        'statuses': Counter(status for _, status in results),
+        'elapsed': elapsed,
+        'qps': len(results) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def print_report(stage: Dict, target_rate: float):
+    """Print latency percentiles and status breakdown for a stage."""
+    latencies = stage['latencies']
+    statuses = stage['statuses']
+    total = sum(statuses.values())
+    errors = sum(count for status, count in statuses.items() if status not in OK_STATUSES)
+
+    target = f"{target_rate:g} QPS" if target_rate > 0 else "unthrottled"
+    print(f"  Target: {target}, achieved: {stage['qps']:.2f} QPS over {stage['elapsed']:.1f}s")
+    print(f"  Latency ms: p50={percentile(latencies, 50) * 1000:.0f}"
+          f"  p95={percentile(latencies, 95) * 1000:.0f}"
+          f"  p99={percentile(latencies, 99) * 1000:.0f}"
+          f"  max={(latencies[-1] if latencies else 0) * 1000:.0f}")
+    print(f"  Errors: {errors}/{total} ({(errors / total * 100) if total else 0:.1f}%)")
+    print("  Status breakdown:")
+    for status, count in statuses.most_common():
+        print(f"    {status}: {count}")
+
+
+def load_queries(args) -> List[str]:
+    if args.queries_file:
+        lines = Path(args.queries_file).read_text(encoding='utf-8').splitlines()
+        return [line.strip() for line in lines if line.strip()]
+    return args.queries or DEFAULT_QUERIES
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Probe Places API latency and sustainable request rate')
+    parser.add_argument('--url', default=PLACES_TEXTSEARCH_URL, help='Endpoint to probe (default: Google Places Text Search)')
+    parser.add_argument('--queries', nargs='+', help='Search queries to cycle through')
+    parser.add_argument('--queries-file', help='File with one query per line')
+    parser.add_argument('--requests', '-n', type=int, default=50, help='Requests per stage (default: 50)')
+    parser.add_argument('--concurrency', '-c', type=int, default=4, help='Concurrent workers (default: 4)')
+    parser.add_argument('--rate', '-r', type=float, default=0, help='Target QPS, 0 = unthrottled (default: 0)')
+    parser.add_argument('--ramp', nargs='+', type=float, help='Run a stage at each QPS until OVER_QUERY_LIMIT appears')
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='Highest error fraction a sustainable stage may have (default: 0.01)')
+    parser.add_argument('--timeout', type=float, default=10, help='Per-request timeout in seconds (default: 10)')
+    parser.add_argument('--send-keys', action='store_true', help='Send API keys to a custom --url too (never done by default)')
+    args = parser.parse_args()
+
+    queries = load_queries(args)
+    keys = []
+    if args.url == PLACES_TEXTSEARCH_URL or args.send_keys:
+        keys = [api_key.key for api_key in CredentialPool.from_env().keys]
+
+    if not keys and args.url == PLACES_TEXTSEARCH_URL:
+        print("❌ No API key configured. Set GOOGLE_MAPS_API_KEY or GOOGLE_MAPS_API_KEYS, or use --url for a local stand-in.")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Places API Probe")
+    print("=" * 60)
+    print(f"Endpoint: {args.url}")
+    print(f"Keys: {len(keys)}, queries: {len(queries)}, concurrency: {args.concurrency}, requests/stage: {args.requests}")
+
+    rates = args.ramp or [args.rate]
+    sustainable = None
+    throttled = False
+
+    for rate in rates:
+        print(f"\nStage @ {f'{rate:g} QPS' if rate > 0 else 'unthrottled'}:")
+        stage = run_stage(args.url, queries, keys, args.requests, args.concurrency, rate, args.timeout)
+        print_report(stage, rate)
+
+        statuses = stage['statuses']
+        total = sum(statuses.values())
+        errors = sum(count for status, count in statuses.items() if status not in OK_STATUSES)
+
+        if statuses.get('OVER_QUERY_LIMIT') or (total and errors / total > args.max_error_rate):
+            print("  ⚠️  Not sustainable at this rate")
+            throttled = True
+            break
+        sustainable = max(sustainable or 0, stage['qps'])
+
+    if args.ramp:
+        print("\n" + "=" * 60)
+        if sustainable is None:
+            print("No sustainable rate found - lower the first --ramp value")
+        elif not throttled:
+            # Every stage passed, so the real limit is somewhere above this
+            print(f"No throttling observed up to {sustainable:.2f} QPS ({len(keys) or 1} key(s)) - "
+                  f"add higher --ramp values to find the limit")
+        else:
+            print(f"Max sustainable rate: {sustainable:.2f} QPS ({len(keys) or 1} key(s))")
+            if keys:
+                print(f"Suggested GOOGLE_MAPS_KEY_QPS: {sustainable / len(keys):.2f}")
+
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
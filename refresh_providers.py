@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Provider Refresh Script
+Re-verifies the stalest entries in the master CSV against Google Places so
+the master stays current without a full rescrape.
+
+Each run picks the N rows with the oldest lastVerified timestamp and:
+- Resolves a missing or obsolete placeId with Find Place (ID-only lookup)
+- Fetches basic Place Details (name, address, location, business status)
+- Updates address details in place and rejects permanently closed entries
+- Lists renamed businesses and moves to another city/state in
+  data/reviews/ instead of changing them, since /admin/import matches rows
+  on business name + city + state and would insert them as new providers
+- Stamps lastVerified (rows Google can't find also count verifyFailures,
+  so they move to the back of the queue instead of being retried every run)
+
+Usage:
+    python refresh_providers.py                  # Refresh the 50 stalest entries
+    python refresh_providers.py --limit 200      # Refresh the 200 stalest entries
+    python refresh_providers.py --states CA NY   # Only load and refresh these partitions
+    python refresh_providers.py --dry-run        # Show what would change
+"""
+
+import argparse
+import csv
+import math
+import re
+import sys
+from datetime import datetime
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+from merge_providers import MASTER_DIR, PartitionedMaster
+from places_client import (
+    PLACES_DETAILS_URL, PLACES_FINDPLACE_URL, CredentialPool, CredentialsExhausted,
+    PlacesApiError, build_session, places_get,
+)
+from scrape_providers import ProviderScraper
+
+# Basic Data fields only - keeps Place Details at the lowest billing tier
+DETAILS_FIELDS = 'place_id,name,formatted_address,geometry,business_status'
+
+# Statuses meaning the place_id itself is unknown or obsolete
+NOT_FOUND_STATUSES = {'NOT_FOUND', 'INVALID_REQUEST'}
+
+# A Find Place candidate must match the row this closely to be accepted
+NAME_MATCH_THRESHOLD = 0.6
+MAX_MATCH_DISTANCE_KM = 1.0
+
+# Identity changes (renames, moves to another city) are written here for manual review
+REVIEW_DIR = Path('data/reviews')
+REVIEW_HEADERS = [
+    'placeId', 'businessName', 'addressLine1', 'city', 'state', 'status',
+    'newBusinessName', 'newAddressLine1', 'newCity', 'newState', 'newZip',
+]
+
+
+def select_stalest(rows: List[Dict], limit: int) -> List[Dict]:
+    """Pick the rows verified longest ago (never-verified rows first)."""
+    candidates = [row for row in rows if row.get('status') != 'REJECTED']
+    return sorted(candidates, key=lambda row: row.get('lastVerified') or '')[:limit]
+
+
+def resolve_place_ids(session: requests.Session, pool: CredentialPool, row: Dict) -> List[str]:
+    """
+    Look up candidate place_ids from the row's name and address.
+
+    Raises:
+        PlacesApiError: On any status other than OK / ZERO_RESULTS
+    """
+    query = ' '.join(
+        row.get(field, '').strip()
+        for field in ('businessName', 'addressLine1', 'city', 'state')
+        if row.get(field, '').strip()
+    )
+    data = places_get(session, pool, PLACES_FINDPLACE_URL, {
+        'input': query,
+        'inputtype': 'textquery',
+        'fields': 'place_id',
+    })
+    status = data.get('status', '')
+    if status == 'ZERO_RESULTS':
+        return []
+    if status != 'OK':
+        raise PlacesApiError(status)
+    return [c['place_id'] for c in data.get('candidates', []) if c.get('place_id')]
+
+
+def fetch_details(session: requests.Session, pool: CredentialPool, place_id: str) -> Optional[Dict]:
+    """
+    Fetch basic details for a place, or None if the ID is unknown.
+
+    Raises:
+        PlacesApiError: On a status that doesn't mean the ID is unknown (e.g. OVER_QUERY_LIMIT)
+    """
+    data = places_get(session, pool, PLACES_DETAILS_URL, {
+        'place_id': place_id,
+        'fields': DETAILS_FIELDS,
+    })
+    status = data.get('status', '')
+    if status in NOT_FOUND_STATUSES:
+        return None
+    if status != 'OK':
+        raise PlacesApiError(status)
+    return data.get('result')
+
+
+def normalize_name(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', ' ', (name or '').lower()).strip()
+
+
+def distance_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Great-circle distance between two (lat, lng) points."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(h))
+
+
+def matches_row(row: Dict, result: Dict) -> bool:
+    """
+    Check that a Find Place result is the same business as the row.
+
+    Requires a similar name plus the same city or zip, or a location
+    within MAX_MATCH_DISTANCE_KM of the row's coordinates.
+    """
+    similarity = SequenceMatcher(None, normalize_name(row.get('businessName', '')),
+                                 normalize_name(result.get('name', ''))).ratio()
+    if similarity < NAME_MATCH_THRESHOLD:
+        return False
+
+    city, _, zip_code = ProviderScraper.parse_address(result.get('formatted_address', ''))
+    if city and city.lower() == (row.get('city') or '').strip().lower():
+        return True
+    if zip_code and zip_code == (row.get('zip') or '').strip():
+        return True
+
+    location = result.get('geometry', {}).get('location', {})
+    try:
+        here = (float(row['latitude']), float(row['longitude']))
+        there = (float(location['lat']), float(location['lng']))
+    except (KeyError, TypeError, ValueError):
+        return False
+    return distance_km(here, there) <= MAX_MATCH_DISTANCE_KM
+
+
+def apply_details(row: Dict, result: Dict) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Update row fields from a Place Details result.
+
+    Business name, city and state are never rewritten: /admin/import
+    matches on them, so a changed value would be imported as a new
+    provider. Those changes are returned for manual review instead.
+
+    Returns:
+        (names of the fields that changed, proposed identity changes)
+    """
+    updates = {'placeId': result.get('place_id', '')}
+    review = {}
+
+    name = result.get('name', '')
+    if name and name != (row.get('businessName') or ''):
+        review['businessName'] = name
+
+    formatted_address = result.get('formatted_address', '')
+    city, state, zip_code = ProviderScraper.parse_address(formatted_address)
+    address_line1 = formatted_address.split(',')[0].strip()
+    moved = bool(city and state) and (
+        city.lower() != (row.get('city') or '').strip().lower()
+        or state.upper() != (row.get('state') or '').strip().upper()
+    )
+
+    if moved:
+        review.update({'addressLine1': address_line1, 'city': city, 'state': state, 'zip': zip_code})
+    else:
+        if city and state:
+            updates.update({'addressLine1': address_line1, 'zip': zip_code})
+
+        location = result.get('geometry', {}).get('location', {})
+        if 'lat' in location and 'lng' in location:
+            updates['latitude'] = str(location['lat'])
+            updates['longitude'] = str(location['lng'])
+
+    if result.get('business_status') == 'CLOSED_PERMANENTLY':
+        updates['status'] = 'REJECTED'
+
+    changed = []
+    for field, value in updates.items():
+        if value and (row.get(field) or '') != value:
+            row[field] = value
+            changed.append(field)
+    return changed, review
+
+
+def refresh_row(session: requests.Session, pool: CredentialPool,
+                row: Dict) -> Optional[Tuple[List[str], Dict[str, str]]]:
+    """
+    Re-verify one row against Google.
+
+    Returns:
+        (changed field names, proposed identity changes), or None if the
+        place could not be found
+
+    Raises:
+        PlacesApiError: If Google couldn't answer (the row is left untouched)
+    """
+    result = None
+    place_id = (row.get('placeId') or '').strip()
+
+    if place_id:
+        result = fetch_details(session, pool, place_id)
+
+    # Missing or obsolete place_id - resolve it from the name and address,
+    # accepting only a candidate that is recognisably the same business
+    if result is None:
+        for candidate_id in resolve_place_ids(session, pool, row):
+            candidate = fetch_details(session, pool, candidate_id)
+            if candidate and matches_row(row, candidate):
+                result = candidate
+                break
+
+    row['lastVerified'] = datetime.now().isoformat(timespec='seconds')
+    if result is None:
+        row['verifyFailures'] = str(int(row.get('verifyFailures') or 0) + 1)
+        return None
+
+    changed, review = apply_details(row, result)
+    row['verifyFailures'] = ''
+    return changed, review
+
+
+def write_review_csv(review_path: Path, reviews: List[Tuple[Dict, Dict[str, str]]]):
+    """Write proposed renames/moves next to the current identity for manual review."""
+    review_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(review_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REVIEW_HEADERS, restval='', extrasaction='ignore')
+        writer.writeheader()
+        for row, review in reviews:
+            writer.writerow({
+                **row,
+                **{f"new{field[0].upper()}{field[1:]}": value for field, value in review.items()},
+            })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-verify the stalest providers in the master CSV')
+    parser.add_argument('--limit', '-n', type=int, default=50, help='Number of entries to refresh (default: 50)')
+    parser.add_argument('--master-dir', default=str(MASTER_DIR), help='Directory holding the state-partitioned master')
+    parser.add_argument('--states', '-s', nargs='+', help='Limit to specific states (e.g., CA NY TX)')
+    parser.add_argument('--dry-run', action='store_true', help='Report changes without writing the master CSV')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Provider Refresh Tool")
+    print("=" * 60)
+
+    pool = CredentialPool.from_env()
+    if not pool:
+        print("❌ Google Maps API key not configured. Set GOOGLE_MAPS_API_KEY or GOOGLE_MAPS_API_KEYS.")
+        sys.exit(1)
+
+    master = PartitionedMaster.open(Path(args.master_dir))
+    states = [s.upper() for s in args.states] if args.states else None
+    rows = master.all_rows(states)
+    stalest = select_stalest(rows, args.limit)
+    print(f"Refreshing {len(stalest)} of {len(rows)} providers (stalest first)\n")
+
+    session = build_session()
+    verified = updated = missing = 0
+    reviews = []
+
+    try:
+        for row in stalest:
+            name = row.get('businessName', '')
+            try:
+                refreshed = refresh_row(session, pool, row)
+            except (requests.RequestException, PlacesApiError) as e:
+                print(f"  ⚠️  {name}: request failed ({e})")
+                continue
+
+            master.mark_dirty(row)
+            if refreshed is None:
+                missing += 1
+                print(f"  ❓ {name}: not found on Google ({row['verifyFailures']} time(s))")
+                continue
+
+            changed, review = refreshed
+            verified += 1
+            if changed:
+                updated += 1
+                print(f"  ✏️  {name}: updated {', '.join(changed)}")
+            if review:
+                reviews.append((row, review))
+                print(f"  🔍 {name}: now {review.get('businessName', name)} in "
+                      f"{review.get('city', row.get('city', ''))}, {review.get('state', row.get('state', ''))} - needs review")
+    except CredentialsExhausted as e:
+        print(f"\nStopping early: {e}")
+
+    if args.dry_run:
+        print("\nDry run - master CSV not written")
+    else:
+        if verified or missing:
+            written = master.save()
+            print(f"\n✅ Master updated: {master.master_dir}")
+            print(f"   Partitions rewritten: {', '.join(written)}")
+        if reviews:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            review_path = REVIEW_DIR / f"refresh_review_{timestamp}.csv"
+            write_review_csv(review_path, reviews)
+            print(f"\n🔍 Renames/moves to review: {review_path}")
+
+    print(f"\nSummary:")
+    print(f"  Verified: {verified}")
+    print(f"  Updated: {updated}")
+    print(f"  Needs review: {len(reviews)}")
+    print(f"  Not found: {missing}")
+    print("\n" + "=" * 60)
+
+
+if __name__ == '__main__':
+    main()
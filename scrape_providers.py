@@ -11,6 +11,8 @@ Configuration:
 
 Required API Key (set in .env file):
 - GOOGLE_MAPS_API_KEY: Get from https://cloud.google.com/maps-platform
+- GOOGLE_MAPS_API_KEYS: Optional comma-separated list of extra keys; requests
+  are spread across all keys (see places_client.py)
 
 Installation:
 pip install requests geopy python-dotenv
@@ -20,17 +22,25 @@ import csv
 import json
 import logging
 import os
+import queue
 import re
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, List, Dict, Tuple
+from typing import Callable, Optional, List, Dict, Tuple
 from dataclasses import dataclass, asdict
 
 import requests
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
 
+from merge_providers import PartitionedMaster
+from places_client import (
+    PLACES_TEXTSEARCH_URL, CredentialPool, CredentialsExhausted, PlacesApiError, build_session, places_get,
+)
+
 # Load environment variables
 try:
     from dotenv import load_dotenv
@@ -64,6 +74,12 @@ SECONDARY_SPECIALTIES = [
     'Homeopathy',
 ]
 
+# Failed geocodes are retried once this many seconds have passed
+GEOCODE_RETRY_SECONDS = 10 * 60
+
+# Upper bound on concurrent searches; the credential pool still rate-limits each key
+MAX_WORKERS = 8
+
 # All specialties combined
 SPECIALTIES = PRIMARY_SPECIALTIES + SECONDARY_SPECIALTIES
 
@@ -141,6 +157,8 @@ class Provider:
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     status: str = 'PENDING'
+    placeId: str = ''  # Google place_id - stable identity across renames/moves
+    lastVerified: str = ''  # ISO timestamp of the last time Google confirmed this entry
     source: str = ''
 
     def to_dict(self) -> Dict:
@@ -150,10 +168,88 @@ class Provider:
         return data
 
 
+class GeocodeWorker:
+    """
+    Background geocoder for providers missing coordinates.
+    
+    Providers are queued as soon as they are accepted so geocoding overlaps
+    with searching. Providers in the same city share a single lookup, whether
+    it is still in flight or already finished. Failed lookups are not cached;
+    the city is retried after GEOCODE_RETRY_SECONDS.
+    """
+    
+    def __init__(self, geocode: Callable[[str, str], Optional[Tuple[float, float]]]):
+        self._geocode = geocode
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], List[Provider]] = {}  # In-flight lookups
+        self._results: Dict[Tuple[str, str], Tuple[float, float]] = {}  # Successful lookups only
+        self._failed: Dict[Tuple[str, str], float] = {}  # Failed lookups -> monotonic time of failure
+        self._thread: Optional[threading.Thread] = None
+        self.geocoded = 0
+    
+    def submit(self, provider: Provider):
+        """Queue a provider for geocoding, coalescing with identical lookups."""
+        key = (provider.city.lower().strip(), provider.state.upper().strip())
+        
+        with self._lock:
+            if key in self._results:
+                self._apply(provider, self._results[key])
+                return
+            
+            failed_at = self._failed.get(key)
+            if failed_at is not None:
+                if time.monotonic() - failed_at < GEOCODE_RETRY_SECONDS:
+                    return
+                del self._failed[key]
+            
+            if key in self._pending:
+                self._pending[key].append(provider)
+                return
+            
+            self._pending[key] = [provider]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='geocoder', daemon=True)
+                self._thread.start()
+        
+        self._queue.put(key)
+    
+    def drain(self) -> int:
+        """Wait for all queued lookups to finish and return providers geocoded so far."""
+        self._queue.join()
+        return self.geocoded
+    
+    def _run(self):
+        while True:
+            key = self._queue.get()
+            coords = None
+            try:
+                with self._lock:
+                    first = self._pending[key][0]
+                
+                coords = self._geocode(first.city, first.state)
+            except Exception as e:
+                logger.debug(f"Geocoding worker error for {key}: {e}")
+            finally:
+                with self._lock:
+                    if coords:
+                        self._results[key] = coords
+                    else:
+                        self._failed[key] = time.monotonic()
+                    for provider in self._pending.pop(key, []):
+                        self._apply(provider, coords)
+                self._queue.task_done()
+    
+    def _apply(self, provider: Provider, coords: Optional[Tuple[float, float]]):
+        if coords and (not provider.latitude or not provider.longitude):
+            provider.latitude, provider.longitude = coords
+            self.geocoded += 1
+
+
 class ProviderScraper:
     """Scrape healthcare provider information from Google Maps Places API."""
     
-    def __init__(self, output_file: str = None):
+    def __init__(self, output_file: str = None, workers: int = None):
         # Auto-generate timestamped filename if not provided
         if output_file is None:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -163,57 +259,86 @@ class ProviderScraper:
         
         self.output_file = output_file
         self.providers: Dict[str, Provider] = {}  # Use dict to deduplicate
-        self.existing_keys: set = set()  # Keys from previous scrapes
+        self.existing_keys: set = set()  # Keys from previous scrapes (place_id and name keys)
+        self.loaded_states: set = set()  # Master partitions already loaded into existing_keys
         self.geocoder = Nominatim(user_agent="finding_health_scraper")
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.geocode_worker = GeocodeWorker(self.geocode_address)
+        self._lock = threading.RLock()  # Guards providers and the dedup index across search threads
+        
+        # API keys - requests are scheduled across every configured key
+        self.credentials = CredentialPool.from_env()
         
-        # API Key
-        self.google_api_key = os.getenv('GOOGLE_MAPS_API_KEY')
+        # Two searches in flight per key hides request latency behind the per-key rate limit
+        self.workers = workers or min(MAX_WORKERS, max(1, 2 * len(self.credentials)))
+        self.session = build_session(pool_size=self.workers)
         
-        if not self.google_api_key:
+        if not self.credentials:
             logger.warning("Google Maps API key not found. Set GOOGLE_MAPS_API_KEY environment variable.")
+        else:
+            logger.info(f"Using {len(self.credentials)} Google Maps API key(s)")
         
-        # Load existing providers from master CSV to avoid duplicates
-        self._load_existing_providers()
+        # Existing providers are loaded per state from the partitioned master
+        self.master = PartitionedMaster.open()
+        if not self.master.catalog:
+            logger.info("No existing master found - will create new one")
     
-    def _load_existing_providers(self):
-        """Load existing providers from master CSV to avoid duplicates."""
-        master_csv = 'data/providers_master.csv'
-        
-        if not os.path.exists(master_csv):
-            logger.info("No existing master CSV found - will create new one")
+    def _load_existing_providers(self, states: List[str]):
+        """Load existing providers for the given states from the master to avoid duplicates."""
+        with self._lock:
+            self._load_partitions([s.upper() for s in states if s and s.upper() not in self.loaded_states])
+    
+    def _load_partitions(self, states: List[str]):
+        if not states:
             return
         
         try:
-            with open(master_csv, 'r', encoding='utf-8', newline='') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Generate key same way as generate_provider_key
-                    business = row.get('businessName', '').lower().strip()
-                    city = row.get('city', '').lower().strip()
-                    state = row.get('state', '').upper().strip()
+            loaded = 0
+            for state in states:
+                for row in self.master.rows(state):
+                    loaded += 1
+                    place_id = row.get('placeId', '').strip()
+                    if place_id:
+                        self.existing_keys.add(f"place:{place_id}")
                     
-                    if business and city and state:
-                        key = f"{business}_{city}_{state}"
-                        self.existing_keys.add(key)
+                    business = row.get('businessName', '')
+                    city = row.get('city', '')
+                    row_state = row.get('state', '')
+                    
+                    if business.strip() and city.strip() and row_state.strip():
+                        self.existing_keys.add(self.generate_name_key(business, city, row_state))
+                
+                self.loaded_states.add(state)
             
-            logger.info(f"Loaded {len(self.existing_keys)} existing providers from master CSV - will skip duplicates")
+            logger.info(f"Loaded {loaded} existing providers for {', '.join(states)} from master - will skip duplicates")
         except Exception as e:
             logger.warning(f"Could not load existing providers: {e}")
     
+    @staticmethod
+    def generate_name_key(business: str, city: str, state: str) -> str:
+        """Generate the name-based fallback key for providers without a place_id."""
+        return f"{business.lower().strip()}_{city.lower().strip()}_{state.lower().strip()}"
+    
     def generate_provider_key(self, provider: Provider) -> str:
-        """Generate a unique key for deduplication."""
-        return f"{provider.businessName.lower()}_{provider.city.lower()}_{provider.state.lower()}"
+        """Generate a unique key for deduplication (place_id when known)."""
+        if provider.placeId:
+            return f"place:{provider.placeId}"
+        return self.generate_name_key(provider.businessName, provider.city, provider.state)
     
     def add_provider(self, provider: Provider):
         """Add provider to collection, avoiding duplicates from current run and previous scrapes."""
+        with self._lock:
+            self._add_provider(provider)
+    
+    def _add_provider(self, provider: Provider):
+        # Results can fall outside the searched state - load that partition too
+        self._load_existing_providers([provider.state])
+        
         key = self.generate_provider_key(provider)
+        name_key = self.generate_name_key(provider.businessName, provider.city, provider.state)
         
-        # Check if already exists in previous scrapes
-        if key in self.existing_keys:
+        # Check if already exists in previous scrapes (by place_id in any state, then by name)
+        if (key in self.existing_keys or name_key in self.existing_keys
+                or self.master.partition_of(provider.placeId) is not None):
             logger.debug(f"Skipped (already scraped): {provider.businessName}")
             return
         
@@ -221,104 +346,131 @@ class ProviderScraper:
         if key not in self.providers:
             self.providers[key] = provider
             logger.info(f"Added: {provider.businessName} in {provider.city}, {provider.state}")
+            
+            # Geocode in the background while searching continues
+            if not provider.latitude or not provider.longitude:
+                self.geocode_worker.submit(provider)
         else:
             logger.debug(f"Skipped duplicate: {provider.businessName}")
     
-    def scrape_google_places(self, specialty: str, state: str = None) -> int:
+    def scrape_google_places(self, specialty: str, state: str = None, cities: List[str] = None,
+                             raise_errors: bool = False) -> int:
         """
         Scrape from Google Maps Places API.
         
         Args:
             specialty: Type of provider to search for
             state: Optional state to limit search
+            cities: Optional cities to search (default: major cities for the state)
+            raise_errors: Raise on HTTP and API errors instead of logging and
+                moving on to the next city
         
         Returns:
             Number of providers found
+        
+        Raises:
+            requests.RequestException, PlacesApiError: Only if raise_errors is set
         """
-        if not self.google_api_key:
+        if not self.credentials:
             logger.warning("Google Maps API key not set. Skipping Google Places.")
             return 0
         
         # Get cities for this state
-        cities = STATE_CITIES.get(state, [state])  # Fall back to state name if no cities defined
+        if not cities:
+            cities = STATE_CITIES.get(state, [state])  # Fall back to state name if no cities defined
         
         added = 0
-        try:
-            for city in cities:
-                # Search in specific city
-                search_query = f"{specialty} {city} {state}"
-                url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-                params = {
-                    'query': search_query,
-                    'key': self.google_api_key,
-                }
+        for city in cities:
+            try:
+                added += self._search_city(specialty, state, city, raise_errors=raise_errors)
+            except requests.RequestException as e:
+                if raise_errors:
+                    raise
+                logger.error(f"Error calling Google Places API: {e}")
+        
+        logger.info(f"Found {added} providers total from Google Places")
+        return added
+    
+    def _search_city(self, specialty: str, state: str, city: str, raise_errors: bool = False) -> int:
+        """
+        Run one text search and add the results.
+        
+        Returns:
+            Number of results processed
+        
+        Raises:
+            CredentialsExhausted: If no API key is available
+            requests.RequestException: On HTTP or network errors
+            PlacesApiError: On an API error status, if raise_errors is set
+        """
+        # Search in specific city
+        search_query = f"{specialty} {city} {state}"
+        
+        logger.info(f"Searching: '{search_query}'...")
+        
+        # Rate limiting is handled per key by the credential pool
+        data = places_get(self.session, self.credentials, PLACES_TEXTSEARCH_URL,
+                          {'query': search_query})
+        
+        logger.info(f"  API Status: {data.get('status')}, Results: {len(data.get('results', []))}")
+        
+        if data.get('status') != 'OK':
+            if data.get('status') == 'ZERO_RESULTS':
+                logger.debug(f"No results for: {search_query}")
+            elif raise_errors:
+                raise PlacesApiError(data.get('status', ''))
+            else:
+                logger.warning(f"Google Places API error: {data.get('status', 'Unknown')}")
+            return 0
+        
+        added = 0
+        for result in data.get('results', []):
+            try:
+                logger.debug(f"Processing: {result.get('name', 'Unknown')}")
                 
-                logger.info(f"Searching: '{search_query}'...")
+                # Extract phone and website (may not be in text search results)
+                phone = result.get('formatted_phone_number', '').replace('(', '').replace(')', '').replace('-', '').replace(' ', '')
                 
-                response = self.session.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
+                # Parse address
+                address_parts = result.get('formatted_address', '').split(',')
+                address_line1 = address_parts[0].strip() if address_parts else ''
                 
-                logger.info(f"  API Status: {data.get('status')}, Results: {len(data.get('results', []))}")
+                # Extract city, state, zip from address
+                parsed_city, state_code, zip_code = self.parse_address(result.get('formatted_address', ''))
                 
-                if data['status'] != 'OK':
-                    if data['status'] == 'ZERO_RESULTS':
-                        logger.debug(f"No results for: {search_query}")
-                    else:
-                        logger.warning(f"Google Places API error: {data.get('status', 'Unknown')}")
+                logger.debug(f"  Address parsed - City: {parsed_city}, State: {state_code}, Zip: {zip_code}")
+                
+                if not parsed_city or not state_code:
+                    logger.debug(f"  Skipped {result.get('name')} - invalid address")
                     continue
                 
-                for result in data.get('results', []):
-                    try:
-                        logger.debug(f"Processing: {result.get('name', 'Unknown')}")
-                        
-                        # Extract phone and website (may not be in text search results)
-                        phone = result.get('formatted_phone_number', '').replace('(', '').replace(')', '').replace('-', '').replace(' ', '')
-                        
-                        # Parse address
-                        address_parts = result.get('formatted_address', '').split(',')
-                        address_line1 = address_parts[0].strip() if address_parts else ''
-                        
-                        # Extract city, state, zip from address
-                        parsed_city, state_code, zip_code = self.parse_address(result.get('formatted_address', ''))
-                        
-                        logger.debug(f"  Address parsed - City: {parsed_city}, State: {state_code}, Zip: {zip_code}")
-                        
-                        if not parsed_city or not state_code:
-                            logger.debug(f"  Skipped {result.get('name')} - invalid address")
-                            continue
-                        
-                        provider = Provider(
-                            businessName=result['name'],
-                            specialties=specialty,
-                            addressLine1=address_line1,
-                            city=parsed_city,
-                            state=state_code,
-                            zip=zip_code,
-                            phone=phone,
-                            website=result.get('website', ''),
-                            latitude=result['geometry']['location']['lat'],
-                            longitude=result['geometry']['location']['lng'],
-                            source='Google Places'
-                        )
-                        
-                        self.add_provider(provider)
-                        added += 1
-                        
-                    except Exception as e:
-                        logger.debug(f"Error processing Google result: {e}")
-                        continue
+                provider = Provider(
+                    businessName=result['name'],
+                    specialties=specialty,
+                    addressLine1=address_line1,
+                    city=parsed_city,
+                    state=state_code,
+                    zip=zip_code,
+                    phone=phone,
+                    website=result.get('website', ''),
+                    latitude=result['geometry']['location']['lat'],
+                    longitude=result['geometry']['location']['lng'],
+                    placeId=result.get('place_id', ''),
+                    lastVerified=datetime.now().isoformat(timespec='seconds'),
+                    source='Google Places'
+                )
                 
-                time.sleep(1.5)  # Rate limiting between city searches
-            
-            logger.info(f"Found {added} providers total from Google Places")
-            return added
-            
-        except requests.RequestException as e:
-            logger.error(f"Error calling Google Places API: {e}")
-            return 0
+                self.add_provider(provider)
+                added += 1
+                
+            except Exception as e:
+                logger.debug(f"Error processing Google result: {e}")
+                continue
+        
+        return added
     
-    def parse_address(self, formatted_address: str) -> Tuple[str, str, str]:
+    @staticmethod
+    def parse_address(formatted_address: str) -> Tuple[str, str, str]:
         """
         Parse formatted address string to extract city, state, zip.
         
@@ -434,7 +586,7 @@ class ProviderScraper:
         logger.info("Starting provider scraping...")
         logger.info("="*60)
         
-        if not self.google_api_key:
+        if not self.credentials:
             logger.error("\nERROR: Google Maps API key not configured!")
             logger.error("Set GOOGLE_MAPS_API_KEY environment variable.")
             logger.error("\nGet API key from: https://cloud.google.com/maps-platform")
@@ -446,6 +598,9 @@ class ProviderScraper:
         states_to_search = self.get_weighted_states(limit_states)
         specialty_weights = self.get_weighted_specialties(limit_specialties)
         
+        # Only the partitions for the states being searched are loaded
+        self._load_existing_providers(states_to_search)
+        
         logger.info(f"\nSearching {len(states_to_search)} states")
         logger.info(f"High population states (65%): {', '.join(states_to_search[:13])}")
         logger.info(f"Lower population states (35%): {', '.join(states_to_search[13:])}")
@@ -455,30 +610,43 @@ class ProviderScraper:
         
         total_before = len(self.providers)
         
-        # Scrape from Google Places with weighted distribution
-        logger.info("\n--- Scraping Google Places ---")
+        # One search per (specialty, state, city) with weighted distribution
+        searches = [
+            (specialty, state, city)
+            for state in states_to_search
+            for specialty, search_count in specialty_weights.items()
+            for _ in range(search_count)
+            for city in STATE_CITIES.get(state, [state])
+        ]
         
-        for state in states_to_search:
-            logger.info(f"\n=> Searching {state} ({US_STATES.get(state, state)})")
-            
-            for specialty, search_count in specialty_weights.items():
-                for i in range(search_count):
-                    try:
-                        self.scrape_google_places(specialty, state)
-                        time.sleep(1.5)  # Rate limiting
-                    except Exception as e:
-                        logger.error(f"Error scraping {specialty} in {state}: {e}")
-                        continue
-        
-        # Add missing coordinates via geocoding
+        # Scrape from Google Places - searches run concurrently and share the key pool
+        logger.info(f"\n--- Scraping Google Places ({len(searches)} searches, {self.workers} workers) ---")
+        stop = threading.Event()
+        
+        def run_search(search: Tuple[str, str, str]):
+            specialty, state, city = search
+            if stop.is_set():
+                return
+            try:
+                self._search_city(specialty, state, city)
+            except CredentialsExhausted as e:
+                if not stop.is_set():
+                    stop.set()
+                    logger.error(f"Stopping search early: {e}")
+            except Exception as e:
+                logger.error(f"Error scraping {specialty} in {city}, {state}: {e}")
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(run_search, searches))
+        
+        logger.info("\n--- API Key Usage ---")
+        for usage in self.credentials.stats():
+            logger.info(f"  {usage['key']}: {usage['requests']} requests ({usage['today']} today), {usage['errors']} errors"
+                        f" (last status: {usage['last_status'] or 'n/a'})")
+        
+        # Missing coordinates are geocoded in the background - wait for the rest
         logger.info("\n--- Geocoding addresses ---")
-        geocoded = 0
-        for provider in list(self.providers.values()):
-            if not provider.latitude or not provider.longitude:
-                coords = self.geocode_address(provider.city, provider.state)
-                if coords:
-                    provider.latitude, provider.longitude = coords
-                    geocoded += 1
+        geocoded = self.geocode_worker.drain()
         
         logger.info(f"Geocoded {geocoded} addresses")
         
@@ -505,7 +673,7 @@ class ProviderScraper:
         fieldnames = [
             'businessName', 'providerName', 'specialties', 'addressLine1',
             'city', 'state', 'zip', 'phone', 'website', 'description',
-            'latitude', 'longitude', 'status'
+            'latitude', 'longitude', 'status', 'placeId', 'lastVerified'
         ]
         
         try:
@@ -563,6 +731,12 @@ def main():
         nargs='+',
         help='Limit to specific states (e.g., CA NY TX)'
     )
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=None,
+        help=f'Concurrent searches (default: 2 per API key, up to {MAX_WORKERS})'
+    )
     parser.add_argument(
         '--specialties', '-sp',
         nargs='+',
@@ -579,7 +753,7 @@ def main():
             sys.exit(1)
         args.states = [s.upper() for s in args.states]
     
-    scraper = ProviderScraper(output_file=args.output)
+    scraper = ProviderScraper(output_file=args.output, workers=args.workers)
     scraper.scrape_all(limit_states=args.states, limit_specialties=args.specialties)
     
     if scraper.save_to_csv():
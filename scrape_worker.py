@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Provider Scrape Worker
+Long-running scraper that keeps one warm ProviderScraper (pooled session,
+API key pool, geocode cache and dedup index) and runs targeted
+(specialty, region) jobs from a local SQLite-backed queue.
+
+Usage:
+    python scrape_worker.py serve                                   # Run the worker + control endpoint
+    python scrape_worker.py enqueue -sp "Naturopathy" -s CA NY       # Queue jobs (worker need not be running)
+    python scrape_worker.py enqueue -sp "Acupuncture" -s TX --city Austin --priority 10
+    python scrape_worker.py status                                  # Queue summary and recent jobs
+
+Control endpoint (localhost only, default port 8787):
+    GET  /status   Queue counts, current job, API key usage
+    GET  /jobs     Recent jobs
+    POST /jobs     Enqueue (Content-Type: application/json):
+                   {"specialty": "...", "state": "CA", "city": "...", "priority": 5}
+    POST /reload   Reload the dedup index from the master
+
+Each finished job's new providers are written to data/scraped/ as usual,
+ready for merge_providers.py.
+"""
+
+import argparse
+import json
+import logging
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from merge_providers import PartitionedMaster
+from places_client import CredentialsExhausted
+from scrape_providers import US_STATES, ProviderScraper
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DB = Path('data/scrape_jobs.db')
+SCRAPED_DIR = Path('data/scraped')
+DEFAULT_PORT = 8787
+
+# Seconds to wait between queue polls when idle
+POLL_INTERVAL = 2.0
+
+# Failed jobs are retried after RETRY_DELAY * 2^(attempt - 1) seconds
+RETRY_DELAY = 30
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Jobs paused because every API key is cooling down wait this long (no attempt used)
+PAUSE_DELAY = 5 * 60
+
+
+class JobQueue:
+    """Priority job queue stored in a local SQLite database."""
+
+    def __init__(self, db_path: Path = QUEUE_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                specialty TEXT NOT NULL,
+                state TEXT NOT NULL,
+                city TEXT NOT NULL DEFAULT '',
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'QUEUED',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                run_after REAL NOT NULL DEFAULT 0,
+                found INTEGER NOT NULL DEFAULT 0,
+                output_file TEXT,
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )""")
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_claim_idx ON jobs(status, priority, run_after)')
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per call keeps the queue safe to use from the HTTP thread
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat(timespec='seconds')
+
+    def enqueue(self, specialty: str, state: str, city: str = '', priority: int = 0,
+                max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+        """
+        Queue a job. An identical job that is still queued keeps its place
+        and takes the higher priority instead of being duplicated.
+
+        Returns:
+            Job id
+        """
+        specialty = specialty.strip()
+        state = state.strip().upper()
+        city = (city or '').strip()
+        if not specialty:
+            raise ValueError("specialty is required")
+        if state not in US_STATES:
+            raise ValueError(f"Invalid state code: {state}")
+
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            existing = conn.execute(
+                "SELECT id, priority FROM jobs WHERE status = 'QUEUED' AND specialty = ? AND state = ? AND city = ?",
+                (specialty, state, city),
+            ).fetchone()
+            if existing:
+                job_id = existing['id']
+                conn.execute(
+                    'UPDATE jobs SET priority = ?, updated_at = ? WHERE id = ?',
+                    (max(existing['priority'], priority), self._now(), job_id),
+                )
+            else:
+                now = self._now()
+                job_id = conn.execute(
+                    'INSERT INTO jobs (specialty, state, city, priority, max_attempts, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (specialty, state, city, priority, max_attempts, now, now),
+                ).lastrowid
+            conn.execute('COMMIT')
+            return job_id
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def claim(self) -> Optional[Dict]:
+        """Take the highest-priority job that is due, marking it RUNNING."""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'QUEUED' AND run_after <= ? "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (time.time(),),
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE jobs SET status = 'RUNNING', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (self._now(), row['id']),
+                )
+            conn.execute('COMMIT')
+            if not row:
+                return None
+            job = dict(row)
+            job['attempts'] += 1
+            return job
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def complete(self, job_id: int, found: int, output_file: Optional[str]):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'DONE', found = ?, output_file = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+                (found, output_file, self._now(), job_id),
+            )
+
+    def fail(self, job: Dict, error: str):
+        """Record a failure, re-queueing with backoff until max_attempts is reached."""
+        with self._connect() as conn:
+            if job['attempts'] < job['max_attempts']:
+                run_after = time.time() + RETRY_DELAY * 2 ** (job['attempts'] - 1)
+                conn.execute(
+                    "UPDATE jobs SET status = 'QUEUED', run_after = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                    (run_after, error, self._now(), job['id']),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'FAILED', last_error = ?, updated_at = ? WHERE id = ?",
+                    (error, self._now(), job['id']),
+                )
+
+    def pause(self, job: Dict, error: str, delay: float = PAUSE_DELAY):
+        """Re-queue a job that couldn't run (e.g. no API key available) without using up an attempt."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'QUEUED', attempts = MAX(attempts - 1, 0), run_after = ?, "
+                "last_error = ?, updated_at = ? WHERE id = ?",
+                (time.time() + delay, error, self._now(), job['id']),
+            )
+
+    def requeue_running(self) -> int:
+        """Return jobs left RUNNING by a previous worker that stopped mid-job."""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'QUEUED', updated_at = ? WHERE status = 'RUNNING'",
+                (self._now(),),
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return {r['status']: r['total'] for r in conn.execute(
+                'SELECT status, COUNT(*) AS total FROM jobs GROUP BY status'
+            )}
+
+    def recent(self, limit: int = 20) -> List[Dict]:
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(
+                'SELECT id, specialty, state, city, priority, status, attempts, found, output_file, last_error, updated_at '
+                'FROM jobs ORDER BY id DESC LIMIT ?',
+                (limit,),
+            )]
+
+
+class ScrapeWorker:
+    """Run queued jobs on a single warm ProviderScraper."""
+
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+        self.scraper = ProviderScraper(output_file='')
+        self.current_job: Optional[Dict] = None
+        self.jobs_run = 0
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stop_event = threading.Event()
+        self._reload_requested = threading.Event()
+
+    def run(self):
+        """Process jobs until stop() is called."""
+        requeued = self.queue.requeue_running()
+        if requeued:
+            logger.info(f"Re-queued {requeued} job(s) interrupted by a previous shutdown")
+
+        while not self.stop_event.is_set():
+            if self._reload_requested.is_set():
+                self._reload()
+
+            job = self.queue.claim()
+            if job is None:
+                self.stop_event.wait(POLL_INTERVAL)
+                continue
+
+            self.current_job = job
+            try:
+                self._run_job(job)
+            finally:
+                self.current_job = None
+
+    def stop(self):
+        self.stop_event.set()
+
+    def request_reload(self):
+        self._reload_requested.set()
+
+    def _run_job(self, job: Dict):
+        region = f"{job['city']}, {job['state']}" if job['city'] else job['state']
+        logger.info(f"Job {job['id']}: {job['specialty']} in {region} (attempt {job['attempts']})")
+
+        try:
+            self.scraper._load_existing_providers([job['state']])
+            # Transport and API errors must reach fail() so the job is retried
+            self.scraper.scrape_google_places(
+                job['specialty'], job['state'], cities=[job['city']] if job['city'] else None,
+                raise_errors=True,
+            )
+            found = len(self.scraper.providers)
+            output_file = self._flush(job['id'])
+        except CredentialsExhausted as e:
+            logger.error(f"Job {job['id']} paused for {PAUSE_DELAY}s: {e}")
+            self._discard()
+            self.queue.pause(job, str(e))
+            return
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {e}")
+            self._discard()
+            self.queue.fail(job, str(e))
+            return
+
+        self.queue.complete(job['id'], found, output_file)
+        self.jobs_run += 1
+        logger.info(f"Job {job['id']} done: {found} new providers" + (f", saved to {output_file}" if output_file else ""))
+
+    def _flush(self, job_id: int) -> Optional[str]:
+        """Save providers found by a job to a scraped CSV and fold them into the dedup index."""
+        self.scraper.geocode_worker.drain()
+        if not self.scraper.providers:
+            return None
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        SCRAPED_DIR.mkdir(parents=True, exist_ok=True)
+        self.scraper.output_file = str(SCRAPED_DIR / f"providers_{timestamp}_job{job_id}.csv")
+        if not self.scraper.save_to_csv():
+            raise RuntimeError(f"Could not save {self.scraper.output_file}")
+
+        with self.scraper._lock:
+            for key, provider in self.scraper.providers.items():
+                self.scraper.existing_keys.add(key)
+                self.scraper.existing_keys.add(
+                    self.scraper.generate_name_key(provider.businessName, provider.city, provider.state)
+                )
+            self.scraper.providers.clear()
+        return self.scraper.output_file
+
+    def _discard(self):
+        """Drop providers from an unfinished job so they aren't saved under the next one (a retry finds them again)."""
+        self.scraper.geocode_worker.drain()
+        with self.scraper._lock:
+            self.scraper.providers.clear()
+
+    def _reload(self):
+        """Drop the dedup index so partitions are re-read from the master on demand."""
+        self._reload_requested.clear()
+        master = PartitionedMaster.open()
+        with self.scraper._lock:
+            self.scraper.master = master
+            self.scraper.existing_keys.clear()
+            self.scraper.loaded_states.clear()
+        logger.info("Dedup index reset - master partitions will be reloaded as jobs need them")
+
+    def status(self) -> Dict:
+        # Called from the HTTP thread - snapshot scraper state under its lock
+        with self.scraper._lock:
+            loaded_states = sorted(self.scraper.loaded_states)
+            known_providers = len(self.scraper.existing_keys)
+        return {
+            'started_at': self.started_at,
+            'jobs_run': self.jobs_run,
+            'current_job': self.current_job,
+            'queue': self.queue.counts(),
+            'loaded_states': loaded_states,
+            'known_providers': known_providers,
+            'api_keys': self.scraper.credentials.stats(),
+        }
+
+
+def make_handler(worker: ScrapeWorker):
+    """Build the control endpoint request handler bound to a worker."""
+
+    class ControlHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload):
+            body = json.dumps(payload, indent=2, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/status':
+                self._send_json(200, worker.status())
+            elif self.path == '/jobs':
+                self._send_json(200, {'jobs': worker.queue.recent()})
+            else:
+                self._send_json(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            if self.path == '/reload':
+                worker.request_reload()
+                self._send_json(202, {'reload': 'scheduled'})
+                return
+            if self.path != '/jobs':
+                self._send_json(404, {'error': 'Not found'})
+                return
+
+            # A JSON content type can't be sent cross-origin without a CORS
+            # preflight, which this server never approves - so web pages
+            # open in the admin's browser can't queue paid searches
+            content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type != 'application/json':
+                self._send_json(415, {'error': 'Content-Type must be application/json'})
+                return
+
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                data = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(data, dict):
+                    raise ValueError("Request body must be a JSON object")
+                job_id = worker.queue.enqueue(
+                    str(data.get('specialty') or ''),
+                    str(data.get('state') or ''),
+                    city=str(data.get('city') or ''),
+                    priority=int(data.get('priority') or 0),
+                )
+            except (ValueError, TypeError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(201, {'id': job_id})
+
+        def log_message(self, format, *args):
+            logger.debug(f"Control: {format % args}")
+
+    return ControlHandler
+
+
+def serve(args):
+    queue = JobQueue(Path(args.db))
+    worker = ScrapeWorker(queue)
+    if not worker.scraper.credentials:
+        logger.error("Google Maps API key not configured. Set GOOGLE_MAPS_API_KEY or GOOGLE_MAPS_API_KEYS.")
+        sys.exit(1)
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(worker))
+    threading.Thread(target=server.serve_forever, name='control', daemon=True).start()
+    logger.info(f"Scrape worker ready - control endpoint on http://127.0.0.1:{args.port}/status")
+
+    def handle_signal(signum, frame):
+        logger.info("Shutting down after the current job...")
+        worker.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    try:
+        worker.run()
+    finally:
+        server.shutdown()
+
+
+def enqueue(args):
+    queue = JobQueue(Path(args.db))
+    for state in [s.upper() for s in args.states]:
+        for specialty in args.specialties:
+            try:
+                job_id = queue.enqueue(specialty, state, city=args.city or '', priority=args.priority)
+            except ValueError as e:
+                logger.error(str(e))
+                sys.exit(1)
+            logger.info(f"Queued job {job_id}: {specialty} in {state}" + (f" ({args.city})" if args.city else ""))
+
+
+def status(args):
+    queue = JobQueue(Path(args.db))
+    counts = queue.counts()
+    print("Queue: " + (", ".join(f"{k}={v}" for k, v in sorted(counts.items())) or "empty"))
+    for job in queue.recent(args.limit):
+        region = f"{job['city']}, {job['state']}" if job['city'] else job['state']
+        line = f"  #{job['id']} [{job['status']}] {job['specialty']} in {region} (priority {job['priority']}, attempts {job['attempts']})"
+        if job['status'] == 'DONE':
+            line += f" - {job['found']} new providers"
+        elif job['last_error']:
+            line += f" - {job['last_error']}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Long-running provider scrape worker with a local job queue')
+    parser.add_argument('--db', default=str(QUEUE_DB), help=f'Job queue database (default: {QUEUE_DB})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='Run the worker and control endpoint')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Control endpoint port (default: {DEFAULT_PORT})')
+    serve_parser.set_defaults(func=serve)
+
+    enqueue_parser = subparsers.add_parser('enqueue', help='Queue scrape jobs')
+    enqueue_parser.add_argument('--specialties', '-sp', nargs='+', required=True, help='Specialties to search')
+    enqueue_parser.add_argument('--states', '-s', nargs='+', required=True, help='State codes (e.g., CA NY)')
+    enqueue_parser.add_argument('--city', help='Search one city instead of the state\'s major cities')
+    enqueue_parser.add_argument('--priority', '-p', type=int, default=0, help='Higher runs first (default: 0)')
+    enqueue_parser.set_defaults(func=enqueue)
+
+    status_parser = subparsers.add_parser('status', help='Show queue summary and recent jobs')
+    status_parser.add_argument('--limit', type=int, default=20, help='Recent jobs to list (default: 20)')
+    status_parser.set_defaults(func=status)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()